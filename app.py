@@ -1,13 +1,13 @@
 import time
-from fastapi import FastAPI, Depends, Request
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from config import EMBEDDINGS_DIR, SECRET_KEY, UPLOAD_DIR
-from cookies import SecureCookieManager, get_current_user
+from config import EMBEDDINGS_DIR, SECRET_KEY, UPLOAD_DIR, WARMUP
+from cookies import SecureCookieManager
 from middlewares import AuthenticatedStaticFiles
 import os
-from langchain_community.document_loaders import TextLoader
 
 from fastapi import Cookie, HTTPException
 
@@ -25,7 +25,29 @@ logger.add("debug.log", level="DEBUG")
 logger.add("error.log", level="ERROR")
 logger.add("info.log", level="INFO")
 
-app = FastAPI()
+
+def warm_up():
+    """Load the heavy dependencies up front, they are otherwise imported lazily."""
+    from llm import get_chat_model
+    from utils import LOADERS, get_loader_for_file
+    from vectorstore import get_vector_store
+
+    start_time = time.time()
+    get_vector_store().warm_up()
+    get_chat_model()
+    for extension in LOADERS:
+        get_loader_for_file(f"warm_up.{extension}")
+    logger.info(f"Warmed up in {time.time() - start_time} seconds")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP:
+        warm_up()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add SessionMiddleware with a secret key
 app.add_middleware(
@@ -71,18 +93,13 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 app.mount("/uploads", AuthenticatedStaticFiles(directory=UPLOAD_DIR), name="uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
-from langchain_groq import ChatGroq
-
-# Initialize ChatGroq and free embeddings model
-
-# Free embeddings model
-
 
 # ------------- Routes ----------------
 
 from routes.user import router as userRouter
 from routes.upload import router as uploadRouter
 from routes.chat import router as chatRouter
+from routes.export import router as exportRouter
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -93,41 +110,5 @@ def read_root(request: Request):
 app.include_router(userRouter)
 app.include_router(uploadRouter)
 app.include_router(chatRouter)
+app.include_router(exportRouter)
 
-
-from fastapi.responses import JSONResponse, Response
-from typing import Literal
-import pandas as pd
-from io import StringIO
-
-
-@app.get("/export/chat")
-def export_chat(
-    type: Literal["json", "csv"],
-    request: Request,
-    user_id: int = Depends(get_current_user),
-):
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Authentication required")
-
-    chat_history = request.session.get("chat_history", [])
-
-    if type == "json":
-        return JSONResponse(
-            content=chat_history,
-            headers={"Content-Disposition": "attachment; filename=chat_export.json"},
-        )
-
-    elif type == "csv":
-
-        df = pd.DataFrame(chat_history)
-        output = StringIO()
-        response = Response(
-            content=output.getvalue(),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=chat_export.csv"},
-        )
-        output.close()
-        return response
-
-    raise HTTPException(status_code=400, detail="Invalid export type")
@@ -0,0 +1,151 @@
+import csv
+import os
+import random
+
+WORDS = (
+    "invoice revenue margin customer contract shipment warehouse supplier "
+    "quarter forecast budget audit policy employee payroll training safety "
+    "incident report network server database backup latency release "
+    "roadmap feature defect priority review approval deadline project "
+    "region market product pricing discount renewal churn segment"
+).split()
+
+
+def make_sentences(rng: random.Random, size: int) -> list[str]:
+    """Generate roughly `size` characters of sentences."""
+    sentences = []
+    total = 0
+    while total < size:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+        sentence = " ".join(words).capitalize() + "."
+        sentences.append(sentence)
+        total += len(sentence) + 1
+    return sentences
+
+
+def write_txt(path: str, sentences: list[str]):
+    with open(path, "w") as f:
+        for i in range(0, len(sentences), 5):
+            f.write(" ".join(sentences[i : i + 5]) + "\n\n")
+
+
+def write_csv(path: str, sentences: list[str]):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "category", "note"])
+        for i, sentence in enumerate(sentences):
+            writer.writerow([i, sentence.split()[0].lower(), sentence])
+
+
+def write_docx(path: str, sentences: list[str]):
+    from docx import Document
+
+    document = Document()
+    for i in range(0, len(sentences), 5):
+        document.add_paragraph(" ".join(sentences[i : i + 5]))
+    document.save(path)
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, sentences: list[str], lines_per_page: int = 40):
+    """Write a plain text PDF by hand so no PDF library is needed."""
+    lines = []
+    for sentence in sentences:
+        # keep lines short enough to stay on the page
+        words = sentence.split()
+        for i in range(0, len(words), 12):
+            lines.append(" ".join(words[i : i + 12]))
+    pages = [
+        lines[i : i + lines_per_page] for i in range(0, len(lines), lines_per_page)
+    ] or [[]]
+
+    objects = []
+    page_ids = []
+    font_id = 3
+    next_id = 4
+    for page in pages:
+        stream = "BT /F1 10 Tf 50 780 Td 14 TL\n"
+        stream += "".join(f"({_pdf_escape(line)}) '\n" for line in page)
+        stream += "ET"
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+        page_ids.append(page_id)
+        objects.append(
+            (
+                page_id,
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                f"/Resources << /Font << /F1 {font_id} 0 R >> >> "
+                f"/Contents {content_id} 0 R >>",
+            )
+        )
+        objects.append(
+            (content_id, f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        )
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects = [
+        (1, "<< /Type /Catalog /Pages 2 0 R >>"),
+        (2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>"),
+        (font_id, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"),
+    ] + objects
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id, body in objects:
+        offsets[obj_id] = len(out)
+        out += f"{obj_id} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for obj_id in range(1, len(objects) + 1):
+        out += f"{offsets[obj_id]:010d} 00000 n \n".encode()
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+WRITERS = {
+    "txt": write_txt,
+    "csv": write_csv,
+    "pdf": write_pdf,
+    "docx": write_docx,
+}
+
+
+def generate_corpus(
+    directory: str,
+    kinds: list[str],
+    files_per_kind: int = 1,
+    size: int = 20_000,
+    seed: int = 0,
+):
+    """Write synthetic documents of roughly `size` characters each.
+
+    Returns the generated file paths and labelled queries, sentences taken from
+    the files as `{"question", "source", "text"}` dicts."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    queries = []
+    for kind in kinds:
+        if kind not in WRITERS:
+            raise ValueError(f"Unsupported corpus file type: {kind}")
+        for i in range(files_per_kind):
+            sentences = make_sentences(rng, size)
+            path = os.path.join(directory, f"synthetic_{kind}_{i}.{kind}")
+            WRITERS[kind](path, sentences)
+            paths.append(path)
+            for sentence in rng.sample(sentences, min(3, len(sentences))):
+                queries.append(
+                    {
+                        "question": sentence,
+                        "source": os.path.basename(path),
+                        "text": sentence,
+                    }
+                )
+    return paths, queries
@@ -0,0 +1,152 @@
+"""Compare embedding backends on throughput and drift from the torch reference.
+
+    python -m benchmarks.embedding_backends --model all-MiniLM-L6-v2 \\
+        --backends torch onnx int8 --texts 2000 --queries 200
+
+Drift is reported as the cosine similarity between each backend's vectors and the
+first backend's, and as the overlap of the top-k documents retrieved per query.
+
+Models without a quantized export in their repository can be exported locally:
+
+    python -m benchmarks.embedding_backends --model all-MiniLM-L6-v2 \\
+        --export-int8 models/all-MiniLM-L6-v2-int8
+
+then use EMBEDDINGS_MODEL=models/all-MiniLM-L6-v2-int8 EMBEDDINGS_BACKEND=int8.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.corpus import make_sentences
+from benchmarks.rag_bench import percentile
+
+
+def export_int8(model_name: str, output_dir: str, config: str = "avx2"):
+    from sentence_transformers import (
+        SentenceTransformer,
+        export_dynamic_quantized_onnx_model,
+    )
+
+    model = SentenceTransformer(model_name, backend="onnx")
+    model.save_pretrained(output_dir)
+    export_dynamic_quantized_onnx_model(model, config, output_dir)
+    print(f"Saved {output_dir}/onnx/model_qint8_{config}.onnx")
+
+
+def normalized(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def top_k(queries: np.ndarray, documents: np.ndarray, k: int) -> list[set]:
+    scores = queries @ documents.T
+    return [set(row) for row in np.argsort(-scores, axis=1)[:, :k]]
+
+
+def measure(model_name, backend, texts, queries):
+    from embedder import load_embeddings_model
+
+    start = time.perf_counter()
+    model = load_embeddings_model(model_name, backend)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    documents = model.embed_documents(texts)
+    encode_seconds = time.perf_counter() - start
+
+    latencies = []
+    query_vectors = []
+    for query in queries:
+        start = time.perf_counter()
+        query_vectors.append(model.embed_query(query))
+        latencies.append(time.perf_counter() - start)
+
+    return (
+        {
+            "load_seconds": load_seconds,
+            "docs_per_sec": len(texts) / encode_seconds,
+            "query_p50_ms": percentile(latencies, 50) * 1000,
+            "query_p99_ms": percentile(latencies, 99) * 1000,
+            "dimensions": len(documents[0]),
+        },
+        normalized(documents),
+        normalized(query_vectors),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "int8"])
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--export-int8", metavar="DIR", help="export and exit")
+    args = parser.parse_args(argv)
+
+    if args.export_int8:
+        export_int8(args.model, args.export_int8)
+        return 0
+
+    rng = random.Random(args.seed)
+    sentences = make_sentences(rng, args.texts * 300)
+    texts = [" ".join(sentences[i : i + 3]) for i in range(0, len(sentences), 3)]
+    texts = texts[: args.texts]
+    queries = rng.sample(sentences, min(args.queries, len(sentences)))
+
+    results = []
+    reference = None
+    for backend in args.backends:
+        row, documents, query_vectors = measure(args.model, backend, texts, queries)
+        if reference is None:
+            reference = (
+                documents,
+                query_vectors,
+                top_k(query_vectors, documents, args.k),
+            )
+        ref_documents, _, ref_top = reference
+        if documents.shape != ref_documents.shape:
+            raise ValueError(
+                f"{backend} produced {documents.shape[1]} dimensions, "
+                f"expected {ref_documents.shape[1]}"
+            )
+        cosine = np.sum(documents * ref_documents, axis=1)
+        overlap = [
+            len(a & b) / args.k
+            for a, b in zip(top_k(query_vectors, documents, args.k), ref_top)
+        ]
+        row.update(
+            {
+                "backend": backend,
+                "mean_cosine": float(cosine.mean()),
+                "min_cosine": float(cosine.min()),
+                f"top{args.k}_overlap": float(np.mean(overlap)),
+            }
+        )
+        results.append(row)
+
+    reference_speed = results[0]["docs_per_sec"]
+    for row in results:
+        row["speedup"] = row["docs_per_sec"] / reference_speed
+        print(
+            "  ".join(
+                f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in row.items()
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
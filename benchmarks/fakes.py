@@ -0,0 +1,85 @@
+import hashlib
+import math
+import re
+import time
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import BaseMessage
+from langchain_text_splitters import CharacterTextSplitter
+
+
+class FakeChatModel(SimpleChatModel):
+    """Deterministic stand-in for ChatGroq, the answer only depends on the prompt."""
+
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _call(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = "\n".join(str(message.content) for message in messages)
+        digest = hashlib.sha1(prompt.encode()).hexdigest()[:12]
+        return f"Answer {digest} for a prompt of {len(prompt)} characters."
+
+
+class ApproxTokenTextSplitter(CharacterTextSplitter):
+    """Stand-in for TokenTextSplitter counting 4 characters per token, as tiktoken
+    downloads its encodings on first use."""
+
+    def __init__(self, chunk_size: int = 4000, chunk_overlap: int = 200, **kwargs):
+        super().__init__(
+            separator=" ",
+            chunk_size=chunk_size * 4,
+            chunk_overlap=chunk_overlap * 4,
+            **kwargs,
+        )
+
+
+class HashingEmbeddings(Embeddings):
+    """Hashed bag of words, lexical only but deterministic and offline so retrieval
+    still finds the chunks sharing words with the query."""
+
+    def __init__(self, size: int = 384):
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(word.encode()).digest()
+            index = int.from_bytes(digest[:4], "little") % self.size
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+# stand-ins for benchmarking only, the app cannot be configured with them
+FAKE_MODELS = {"hash"}
+
+
+def make_embeddings(model_name: str):
+    """`hash` gives a network free deterministic embedding, anything else is loaded
+    as a local sentence-transformers model."""
+    if model_name == "hash":
+        return HashingEmbeddings()
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=model_name)
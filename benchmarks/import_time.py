@@ -0,0 +1,96 @@
+"""Check that importing the app stays fast and free of heavy dependencies.
+
+    python -m benchmarks.import_time --budget 1.5
+
+Imports `app` in a fresh interpreter, fails when the import takes longer than
+`--budget` seconds or pulls in a module that should only load on first use.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# imported lazily by the code paths that need them
+HEAVY_MODULES = [
+    "pandas",
+    "faiss",
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "langchain_huggingface",
+    "langchain_groq",
+    "langchain_community.document_loaders",
+    "langchain_community.vectorstores",
+    "langchain_core.runnables",
+]
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "modules": sorted(sys.modules)}))
+"""
+
+
+def measure() -> tuple[dict, list[tuple[int, str]]]:
+    workdir = tempfile.mkdtemp(prefix="import-time-")
+    env = {
+        **os.environ,
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "EMBEDDINGS_DIR": os.path.join(workdir, "embeddings"),
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'app.db')}",
+    }
+    os.makedirs(env["UPLOAD_DIR"])
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # -X importtime lines look like "import time: self | cumulative | name"
+    slowest = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # two spaces of indent per nesting level, keep what app imports directly
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            slowest.append((int(cumulative), name.strip()))
+    slowest.sort(reverse=True)
+    return json.loads(result.stdout.splitlines()[-1]), slowest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=1.5, help="seconds")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    result, slowest = measure()
+    print(f"import app: {result['seconds']:.3f}s (budget {args.budget}s)")
+    for cumulative, name in slowest[: args.top]:
+        print(f"{cumulative / 1e6:>8.3f}s  {name}")
+
+    loaded = [
+        module
+        for module in HEAVY_MODULES
+        if any(m == module or m.startswith(module + ".") for m in result["modules"])
+    ]
+    failed = False
+    if loaded:
+        print(f"Heavy modules imported eagerly: {', '.join(loaded)}", file=sys.stderr)
+        failed = True
+    if result["seconds"] > args.budget:
+        print("Import time over budget", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
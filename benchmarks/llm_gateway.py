@@ -0,0 +1,210 @@
+"""Burst test of the LLM gateway against a local fake OpenAI compatible server.
+
+    python -m benchmarks.llm_gateway --requests 200 --threads 32 --distinct 50 \\
+        --latency 0.2 --fail-every 5
+
+The fake server answers /openai/v1/chat/completions (the Groq path) and
+/v1/chat/completions after `--latency` seconds, and answers every `--fail-every`th
+request with a 429 to exercise the retries. The run fails (exit code 1) unless every
+request succeeded, identical in-flight prompts reached the server once, 429s were
+retried no sooner than their Retry-After and the concurrency limit held.
+
+The server can also stand in for Groq when running the app or
+`benchmarks.rag_bench --llm-url`:
+
+    python -m benchmarks.llm_gateway --serve --port 8900
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks.rag_bench import percentile
+
+RETRY_AFTER = 0.1
+
+
+def create_fake_server(latency: float = 0.0, fail_every: int = 0) -> FastAPI:
+    server = FastAPI()
+    stats = {
+        "requests": 0,
+        "rate_limited": 0,
+        "concurrent": 0,
+        "max_concurrent": 0,
+        "prompts": {},  # answered requests per prompt
+        "retry_gaps": [],  # seconds between a 429 and the retry of that prompt
+    }
+    counter = itertools.count(1)
+    limited_at = {}
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = " ".join(str(m.get("content", "")) for m in body["messages"])
+        stats["requests"] += 1
+        if prompt in limited_at:
+            stats["retry_gaps"].append(time.monotonic() - limited_at.pop(prompt))
+        if fail_every and next(counter) % fail_every == 0:
+            stats["rate_limited"] += 1
+            limited_at[prompt] = time.monotonic()
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached"}},
+                headers={"retry-after": str(RETRY_AFTER)},
+            )
+        stats["prompts"][prompt] = stats["prompts"].get(prompt, 0) + 1
+
+        stats["concurrent"] += 1
+        stats["max_concurrent"] = max(stats["max_concurrent"], stats["concurrent"])
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            stats["concurrent"] -= 1
+
+        content = f"Fake answer to a prompt of {len(prompt)} characters."
+        return {
+            "id": f"fake-{stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (len(prompt) + len(content)) // 4,
+            },
+        }
+
+    server.add_api_route(
+        "/openai/v1/chat/completions", chat_completions, methods=["POST"]
+    )
+    server.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+    server.add_api_route("/stats", lambda: stats, methods=["GET"])
+    return server
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_server(port: int, **kwargs):
+    """Run the fake server in a background thread, returns its base URL."""
+    import uvicorn
+
+    config = uvicorn.Config(
+        create_fake_server(**kwargs), host="127.0.0.1", port=port, log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument(
+        "--distinct", type=int, default=100, help="different prompts among requests"
+    )
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--fail-every", type=int, default=0)
+    parser.add_argument("--rate-limit", type=float, default=0, help="per minute")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--serve", action="store_true", help="only run the server")
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    port = args.port or free_port()
+    url = start_fake_server(port, latency=args.latency, fail_every=args.fail_every)
+    if args.serve:
+        print(f"Fake OpenAI compatible server on {url}, set LLM_BASE_URL={url}")
+        threading.Event().wait()
+
+    # the gateway reads its settings from config when first imported
+    os.environ["LLM_BASE_URL"] = url
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.environ["LLM_RATE_LIMIT"] = str(args.rate_limit)
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.concurrency)
+    import httpx
+
+    from llm import get_chat_model
+
+    chat_model = get_chat_model()
+
+    def ask(i):
+        start = time.perf_counter()
+        try:
+            chat_model.invoke(f"Question {i}")
+            return True, time.perf_counter() - start
+        except Exception:
+            return False, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as executor:
+        prompts = [f"number {i % args.distinct}" for i in range(args.requests)]
+        results = list(executor.map(ask, prompts))
+    elapsed = time.perf_counter() - start
+
+    # identical prompts sent at the same moment must reach the server once
+    barrier = threading.Barrier(args.threads)
+
+    def ask_same(_):
+        barrier.wait()
+        return ask("coalescing check")
+
+    with ThreadPoolExecutor(args.threads) as executor:
+        coalesced = list(executor.map(ask_same, range(args.threads)))
+
+    latencies = [latency for _, latency in results]
+    stats = httpx.get(f"{url}/stats").json()
+    succeeded = sum(ok for ok, _ in results + coalesced)
+    print(f"       succeeded: {sum(ok for ok, _ in results)}/{args.requests}")
+    print(f"         seconds: {elapsed:.2f}")
+    print(f"          p50_ms: {percentile(latencies, 50) * 1000:.1f}")
+    print(f"          p99_ms: {percentile(latencies, 99) * 1000:.1f}")
+    print(f"upstream_requests: {stats['requests']}")
+    print(f"    rate_limited: {stats['rate_limited']}")
+    print(f"  max_concurrent: {stats['max_concurrent']}")
+
+    checks = {
+        "every request succeeded": succeeded == args.requests + args.threads,
+        f"at most {args.concurrency} concurrent requests": stats["max_concurrent"]
+        <= args.concurrency,
+    }
+    if args.latency:
+        # without latency the first request may finish before the others arrive
+        checks["identical in-flight prompts sent once"] = (
+            stats["prompts"].get("Question coalescing check") == 1
+        )
+    if args.fail_every:
+        checks["429s retried after Retry-After"] = (
+            stats["rate_limited"] > 0
+            and len(stats["retry_gaps"]) == stats["rate_limited"]
+            and min(stats["retry_gaps"]) >= RETRY_AFTER - 0.01
+        )
+    print()
+    for name, passed in checks.items():
+        print(f"{'ok' if passed else 'FAILED':>6}  {name}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Offline benchmark of the upload -> chat -> delete hot paths.
+
+Run from the repository root:
+
+    python -m benchmarks.rag_bench --kinds txt pdf csv docx --size 50000 --queries 20
+
+The app is driven through the FastAPI TestClient with a deterministic fake chat
+model instead of ChatGroq (or the real client against `--llm-url`, see
+`benchmarks.llm_gateway --serve`) and a local embedding model (`--embeddings-model hash`
+needs no download at all). The context is truncated with an approximate token
+splitter instead of tiktoken, whose encodings are downloaded, so no network access
+is required.
+"""
+
+import argparse
+import json
+import os
+import re
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fakes import ApproxTokenTextSplitter, FakeChatModel, make_embeddings
+
+# metrics where a bigger number is better, everything else is lower is better
+HIGHER_IS_BETTER = {"chunks_per_sec"}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def prepare_environment(workdir: str):
+    """Point the app at throwaway storage, must run before the app is imported."""
+    os.environ["UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+    os.environ["EMBEDDINGS_DIR"] = os.path.join(workdir, "embeddings")
+    os.environ["PARSED_DIR"] = os.path.join(workdir, "parsed")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.makedirs(os.environ["UPLOAD_DIR"], exist_ok=True)
+    os.makedirs(os.environ["EMBEDDINGS_DIR"], exist_ok=True)
+
+
+def patch_app(chat_model, embeddings):
+    """Swap the network backed models used by the routes for local ones."""
+    import langchain.text_splitter
+
+    import embedder
+    import routes.chat
+
+    # new_chat imports it on every request, so patching the module is enough
+    langchain.text_splitter.TokenTextSplitter = ApproxTokenTextSplitter
+
+    # the fake still goes through the shared query cache and batcher
+    embedder.load_embeddings_model = lambda *args, **kwargs: embeddings
+    embedder.get_embeddings.cache_clear()
+    if chat_model is not None:
+        routes.chat.get_chat_model = lambda: chat_model
+
+
+def login(client, username: str = "bench", password: str = "bench"):
+    client.post("/signup", data={"username": username, "password": password})
+    response = client.post(
+        "/login",
+        data={"username": username, "password": password},
+        follow_redirects=False,
+    )
+    if "user_id" not in response.cookies:
+        raise RuntimeError("Could not log in the benchmark user")
+    client.cookies.set("user_id", response.cookies["user_id"])
+
+
+def count_chunks(embeddings_dir: str, embeddings) -> int:
+    from langchain_community.vectorstores import FAISS
+
+    total = 0
+    for user_dir in os.listdir(embeddings_dir):
+        path = os.path.join(embeddings_dir, user_dir, "vectorstore.faiss")
+        if os.path.exists(path):
+            vectorstore = FAISS.load_local(
+                path, embeddings, allow_dangerous_deserialization=True
+            )
+            total += vectorstore.index.ntotal
+    return total
+
+
+def run(args) -> dict:
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rag-bench-")
+    prepare_environment(workdir)
+    if args.llm_url:
+        # exercise the real LLM gateway against a fake server
+        os.environ["LLM_BASE_URL"] = args.llm_url
+        os.environ.setdefault("GROQ_API_KEY", "fake")
+    paths, queries = generate_corpus(
+        os.path.join(workdir, "corpus"),
+        args.kinds,
+        files_per_kind=args.files_per_kind,
+        size=args.size,
+        seed=args.seed,
+    )
+
+    tracemalloc.start()
+    from fastapi.testclient import TestClient
+    from loguru import logger
+
+    from app import app
+    from models import File, SessionLocal
+
+    if not args.verbose:
+        logger.remove()
+
+    embeddings = make_embeddings(args.embeddings_model)
+    chat_model = None if args.llm_url else FakeChatModel(latency=args.llm_latency)
+    patch_app(chat_model, embeddings)
+
+    client = TestClient(app)
+    login(client)
+
+    ingest_start = time.perf_counter()
+    for path in paths:
+        with open(path, "rb") as f:
+            response = client.post(
+                "/upload/", files={"file": (os.path.basename(path), f)}
+            )
+        response.raise_for_status()
+    ingest_time = time.perf_counter() - ingest_start
+    chunks = count_chunks(os.environ["EMBEDDINGS_DIR"], embeddings)
+    index_size = directory_size(os.environ["EMBEDDINGS_DIR"])
+
+    latencies = []
+    chat_id = -1
+    for i in range(args.queries):
+        query = queries[i % len(queries)]["question"]
+        start = time.perf_counter()
+        response = client.post("/chat/", data={"chat_id": chat_id, "query": query})
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+        match = re.search(r'id="message_chat_id" value="(\d+)"', response.text)
+        if match:
+            chat_id = int(match.group(1))
+
+    db = SessionLocal()
+    file_ids = [file.id for file in db.query(File).all()]
+    db.close()
+    delete_latencies = []
+    for file_id in file_ids:
+        start = time.perf_counter()
+        response = client.request("DELETE", "/upload/", data={"file_id": file_id})
+        delete_latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "files": len(paths),
+        "chunks": chunks,
+        "ingest_seconds": ingest_time,
+        "chunks_per_sec": chunks / ingest_time if ingest_time else 0.0,
+        "chat_p50_ms": percentile(latencies, 50) * 1000,
+        "chat_p99_ms": percentile(latencies, 99) * 1000,
+        "delete_p50_ms": percentile(delete_latencies, 50) * 1000,
+        "python_peak_mb": traced_peak / 2**20,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "index_size_kb": index_size / 1024,
+    }
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for key, base in baseline.items():
+        if key not in results or not isinstance(base, (int, float)) or not base:
+            continue
+        if key in ("files", "chunks"):
+            continue
+        value = results[key]
+        if key in HIGHER_IS_BETTER:
+            worse = value < base * (1 - tolerance)
+        else:
+            worse = value > base * (1 + tolerance)
+        if worse:
+            regressions.append(f"{key}: {value:.2f} (baseline {base:.2f})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kinds", nargs="+", default=["txt", "pdf", "csv", "docx"])
+    parser.add_argument("--files-per-kind", type=int, default=2)
+    parser.add_argument("--size", type=int, default=20_000, help="characters per file")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embeddings-model", default="hash")
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.0, help="seconds per fake LLM call"
+    )
+    parser.add_argument(
+        "--llm-url", help="OpenAI compatible server to use instead of the fake model"
+    )
+    parser.add_argument("--workdir", help="defaults to a fresh temporary directory")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--verbose", action="store_true", help="keep app logging")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    for key, value in results.items():
+        print(
+            f"{key:>16}: {value:,.2f}"
+            if isinstance(value, float)
+            else f"{key:>16}: {value}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Compare retrieval quality and speed across chunking / k / embedding configurations.
+
+The labelled set is a JSONL file, one question per line:
+
+    {"question": "...", "source": "report.pdf", "text": "passage answering it"}
+
+`source` is the file name inside `--files` and `text` the passage a relevant chunk
+has to contain. A chunk is counted as relevant when it comes from `source` and
+contains the passage, or one whole half of it when the passage got split across
+two chunks.
+
+    python -m benchmarks.retrieval_eval --dataset labels.jsonl --files docs/ \\
+        --chunk-sizes 500 1000 --overlaps 100 200 --k 3 5 --recall-floor 0.9
+
+Without `--dataset` a synthetic corpus and labelled set is generated.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fakes import FAKE_MODELS, make_embeddings
+from benchmarks.rag_bench import percentile
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def is_relevant(doc, label: dict) -> bool:
+    if doc.metadata.get("file_name") != label["source"]:
+        return False
+    content = normalize(doc.page_content)
+    text = normalize(label["text"])
+    half = len(text) // 2
+    return text in content or text[:half] in content or text[half:] in content
+
+
+def load_dataset(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_corpus(files_dir: str, labels: list[dict]) -> dict:
+    """Parse every labelled source file once, parsing does not depend on the config."""
+    from utils import load_file
+
+    raw = {}
+    for name in sorted({label["source"] for label in labels}):
+        documents = load_file(os.path.join(files_dir, name))
+        for doc in documents:
+            doc.metadata = {"file_name": name}
+        raw[name] = documents
+    return raw
+
+
+def index_bytes(vectorstore) -> int:
+    import faiss
+
+    text_bytes = sum(
+        len(doc.page_content.encode()) for doc in vectorstore.docstore._dict.values()
+    )
+    return faiss.serialize_index(vectorstore.index).nbytes + text_bytes
+
+
+def evaluate(raw: dict, labels: list[dict], embeddings, chunk_size, overlap, ks):
+    from langchain_community.vectorstores import FAISS
+
+    from utils import get_text_splitter
+
+    splitter = get_text_splitter(chunk_size=chunk_size, chunk_overlap=overlap)
+    documents = [
+        chunk for docs in raw.values() for chunk in splitter.split_documents(docs)
+    ]
+
+    start = time.perf_counter()
+    vectorstore = FAISS.from_documents(documents, embeddings)
+    build_seconds = time.perf_counter() - start
+
+    # searched once per k so the latency columns tell the k values apart
+    latencies = {k: [] for k in ks}
+    ranks = []
+    for label in labels:
+        # untimed, so the first k timed does not pay for cold caches
+        vectorstore.similarity_search(label["question"], k=max(ks))
+        for k in sorted(ks):
+            start = time.perf_counter()
+            docs = vectorstore.similarity_search(label["question"], k=k)
+            latencies[k].append(time.perf_counter() - start)
+        # ranks from the largest k also give the recall at every smaller k
+        rank = next(
+            (i + 1 for i, doc in enumerate(docs) if is_relevant(doc, label)), None
+        )
+        ranks.append(rank)
+
+    rows = []
+    for k in ks:
+        hits = [rank for rank in ranks if rank is not None and rank <= k]
+        rows.append(
+            {
+                "chunk_size": chunk_size,
+                "overlap": overlap,
+                "k": k,
+                "chunks": len(documents),
+                "recall": len(hits) / len(labels),
+                "mrr": sum(1 / rank for rank in hits) / len(labels),
+                "query_p50_ms": percentile(latencies[k], 50) * 1000,
+                "query_p99_ms": percentile(latencies[k], 99) * 1000,
+                "build_seconds": build_seconds,
+                "index_mb": index_bytes(vectorstore) / 2**20,
+            }
+        )
+    return rows
+
+
+def print_table(rows: list[dict]):
+    columns = list(rows[0].keys())
+    print("  ".join(f"{column:>14}" for column in columns))
+    for row in rows:
+        print(
+            "  ".join(
+                f"{row[c]:>14.3f}" if isinstance(row[c], float) else f"{row[c]!s:>14}"
+                for c in columns
+            )
+        )
+
+
+def pick_best(rows: list[dict], recall_floor: float):
+    """Fastest configuration meeting the recall floor, cheaper indexes, then fewer
+    chunks sent to the LLM break ties."""
+    candidates = [row for row in rows if row["recall"] >= recall_floor]
+    if not candidates:
+        return None
+    return min(
+        candidates,
+        key=lambda row: (
+            row["query_p50_ms"],
+            row["build_seconds"],
+            row["index_mb"],
+            row["k"],
+        ),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", help="labelled questions as JSONL")
+    parser.add_argument("--files", help="directory holding the labelled source files")
+    parser.add_argument("--chunk-sizes", nargs="+", type=int, default=[500, 1000])
+    parser.add_argument("--overlaps", nargs="+", type=int, default=[100, 200])
+    parser.add_argument("--k", nargs="+", type=int, default=[3, 5])
+    parser.add_argument(
+        "--models", nargs="+", default=["hash"], help="embedding models to compare"
+    )
+    parser.add_argument("--recall-floor", type=float, default=0.8)
+    parser.add_argument("--output", help="write all rows as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.dataset:
+        if not args.files:
+            parser.error("--files is required with --dataset")
+        labels = load_dataset(args.dataset)
+        files_dir = args.files
+    else:
+        files_dir = tempfile.mkdtemp(prefix="retrieval-eval-")
+        _, labels = generate_corpus(files_dir, ["txt", "pdf", "csv"], files_per_kind=2)
+
+    raw = load_corpus(files_dir, labels)
+    rows = []
+    for model in args.models:
+        embeddings = make_embeddings(model)
+        for chunk_size, overlap in itertools.product(args.chunk_sizes, args.overlaps):
+            if overlap >= chunk_size:
+                continue
+            for row in evaluate(raw, labels, embeddings, chunk_size, overlap, args.k):
+                rows.append({"model": model, **row})
+
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+    # fake models only help compare chunking, they cannot be deployed
+    deployable = [row for row in rows if row["model"] not in FAKE_MODELS]
+    best = pick_best(deployable or rows, args.recall_floor)
+    if best is None:
+        print(f"\nNo configuration reaches recall@k >= {args.recall_floor}")
+        return 1
+    model = "" if best["model"] in FAKE_MODELS else f"EMBEDDINGS_MODEL={best['model']} "
+    print(
+        f"\nFastest configuration with recall@k >= {args.recall_floor}: "
+        f"{model}CHUNK_SIZE={best['chunk_size']} "
+        f"CHUNK_OVERLAP={best['overlap']} RETRIEVER_K={best['k']}"
+    )
+    if not deployable:
+        print(
+            f"(measured with the {best['model']} stand-in, pass --models to pick one)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,10 +2,54 @@
 import os
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3-8b-8192")
+# any Groq / OpenAI compatible server, None uses api.groq.com
+LLM_BASE_URL = os.getenv("LLM_BASE_URL")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 60))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+# requests per minute, 0 disables rate limiting
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", 30))
+# longest a request waits for the rate limit before failing with a 503
+LLM_MAX_QUEUE_WAIT = float(os.getenv("LLM_MAX_QUEUE_WAIT", 10))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
 # os.environ["GROQ_API_KEY"] = GROQ_API_KEY
 SECRET_KEY = os.getenv(
     "SECRET_KEY", "12df3cv45sge5wer7teu7ew73uj47463672yh7e6y3hdjjdkdjdhduw8w7eh"
 )
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+# largest accepted upload and total size of a user's files, 0 disables the quota
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_MB", 50)) * 1024 * 1024
+UPLOAD_QUOTA_BYTES = int(os.getenv("UPLOAD_QUOTA_MB", 500)) * 1024 * 1024
 EMBEDDINGS_DIR = os.getenv("EMBEDDINGS_DIR", "embeddings")
 EMBEDDINGS_MODEL = os.getenv("EMBEDDINGS_MODEL", "all-MiniLM-L6-v2")
+# torch, onnx or int8 (dynamically quantized onnx), see embedder.load_embeddings_model
+EMBEDDINGS_BACKEND = os.getenv("EMBEDDINGS_BACKEND", "torch")
+EMBEDDINGS_INT8_FILE = os.getenv("EMBEDDINGS_INT8_FILE", "onnx/model_qint8_avx2.onnx")
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+# how long to wait for concurrent queries to join a batch, 0 disables waiting
+QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", 2))
+QUERY_BATCH_SIZE = int(os.getenv("QUERY_BATCH_SIZE", 32))
+# extracted text cache keyed by file content hash, see parsing.parse_file
+PARSED_DIR = os.getenv("PARSED_DIR", "parsed")
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", os.cpu_count() or 1))
+PARSE_PAGES_PER_TASK = int(os.getenv("PARSE_PAGES_PER_TASK", 20))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 200))
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", 5))
+# cross-encoder rescoring the top RERANK_FETCH_K chunks, empty disables reranking
+RERANK_MODEL = os.getenv("RERANK_MODEL", "")
+RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", 20))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", 300))
+# rough token budget for the summary plus recent messages sent with each question
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", 1000))
+# newest messages always kept verbatim instead of being folded into the summary
+MEMORY_RECENT_MESSAGES = int(os.getenv("MEMORY_RECENT_MESSAGES", 4))
+# load the models at startup instead of on the first request
+WARMUP = os.getenv("WARMUP", "false").lower() in ("1", "true", "yes")
+# unix:///path/to.sock or http://host:port of vector_service, empty searches in process
+VECTOR_SERVICE_URL = os.getenv("VECTOR_SERVICE_URL", "")
+# shared secret between the web workers and vector_service, required by the service
+VECTOR_SERVICE_TOKEN = os.getenv("VECTOR_SERVICE_TOKEN", "")
+# per-user indexes kept in memory, the least recently used are reloaded from disk
+INDEX_CACHE_SIZE = int(os.getenv("INDEX_CACHE_SIZE", 64))
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
@@ -0,0 +1,161 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from config import (
+    EMBEDDINGS_BACKEND,
+    EMBEDDINGS_INT8_FILE,
+    EMBEDDINGS_MODEL,
+    QUERY_BATCH_SIZE,
+    QUERY_BATCH_WAIT_MS,
+    QUERY_CACHE_SIZE,
+)
+
+
+class QueryBatcher:
+    """Coalesces queries from concurrent requests into one model call.
+
+    A single worker thread takes everything queued, waits up to `max_wait` seconds
+    for more queries to arrive and encodes them as one batch. Queries arriving while
+    a batch is being encoded are picked up by the next one."""
+
+    def __init__(self, embed_batch, max_wait: float, max_batch: int):
+        self.embed_batch = embed_batch
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.pending: list[tuple[str, Future]] = []
+        self.condition = threading.Condition()
+        self.worker = None
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        with self.condition:
+            if self.worker is None:
+                self.worker = threading.Thread(
+                    target=self._run, name="query-batcher", daemon=True
+                )
+                self.worker.start()
+            self.pending.append((text, future))
+            self.condition.notify()
+        return future
+
+    def embed(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    def _next_batch(self):
+        with self.condition:
+            while not self.pending:
+                self.condition.wait()
+            if self.max_wait:
+                self.condition.wait_for(
+                    lambda: len(self.pending) >= self.max_batch, timeout=self.max_wait
+                )
+            batch = self.pending[: self.max_batch]
+            self.pending = self.pending[self.max_batch :]
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            # identical queries in one batch are only encoded once
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = dict(zip(texts, self.embed_batch(texts)))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            logger.debug("Encoded {} queries in one batch", len(texts))
+            for text, future in batch:
+                future.set_result(vectors[text])
+
+
+class QueryEmbeddings(Embeddings):
+    """Wraps an embeddings model with an LRU cache and a `QueryBatcher` for queries.
+
+    Documents are passed straight through, they are already encoded in batches."""
+
+    def __init__(
+        self,
+        model: Embeddings,
+        cache_size: int = QUERY_CACHE_SIZE,
+        max_wait: float = QUERY_BATCH_WAIT_MS / 1000,
+        max_batch: int = QUERY_BATCH_SIZE,
+    ):
+        self.model = model
+        self.cache_size = cache_size
+        self.cache: OrderedDict[str, List[float]] = OrderedDict()
+        self.inflight: dict[str, Future] = {}
+        self.lock = threading.Lock()
+        # a batch of queries is encoded like documents, which is the same forward
+        # pass for sentence-transformers models without query prompts
+        self.batcher = QueryBatcher(model.embed_documents, max_wait, max_batch)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self.lock:
+            if text in self.cache:
+                self.cache.move_to_end(text)
+                return self.cache[text]
+            # requests asking for a query already being encoded share its result
+            future = self.inflight.get(text)
+            owner = future is None
+            if owner:
+                future = self.batcher.submit(text)
+                self.inflight[text] = future
+
+        try:
+            vector = future.result()
+        finally:
+            if owner:
+                with self.lock:
+                    self.inflight.pop(text, None)
+
+        if owner and self.cache_size:
+            with self.lock:
+                self.cache[text] = vector
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return vector
+
+
+BACKENDS = ("torch", "onnx", "int8")
+
+
+def load_embeddings_model(
+    model_name: str = EMBEDDINGS_MODEL, backend: str = EMBEDDINGS_BACKEND
+):
+    """Load the sentence-transformers model on one of the supported backends.
+
+    All backends run the same model so the vectors keep their dimension and existing
+    indexes stay usable. `onnx` and `int8` need `optimum[onnxruntime]`, `int8` loads
+    the quantized export `EMBEDDINGS_INT8_FILE` from the model repository."""
+    if backend == "torch":
+        model_kwargs = {}
+    elif backend == "onnx":
+        model_kwargs = {"backend": "onnx"}
+    elif backend == "int8":
+        model_kwargs = {
+            "backend": "onnx",
+            "model_kwargs": {"file_name": EMBEDDINGS_INT8_FILE},
+        }
+    else:
+        raise ValueError(f"Unsupported embeddings backend: {backend}")
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    logger.info("Loading embeddings model {} on {}", model_name, backend)
+    return HuggingFaceEmbeddings(model_name=model_name, model_kwargs=model_kwargs)
+
+
+@lru_cache(maxsize=None)
+def get_embeddings() -> QueryEmbeddings:
+    """Shared embeddings model, loading it is far too slow to do per request."""
+    return QueryEmbeddings(load_embeddings_model())
@@ -0,0 +1,38 @@
+from functools import lru_cache
+
+from config import (
+    GROQ_API_KEY,
+    LLM_BASE_URL,
+    LLM_MAX_CONCURRENCY,
+    LLM_MODEL,
+    LLM_TIMEOUT,
+)
+
+
+@lru_cache(maxsize=None)
+def get_chat_model():
+    """Shared chat model, built on first use to keep imports fast.
+
+    One ChatGroq client reuses its HTTP connections across requests. Retries are done
+    by the gateway so the SDK's own are disabled."""
+    import httpx
+    from langchain_groq import ChatGroq
+
+    from llm_gateway import GatewayChatModel, RequestGate
+
+    http_client = httpx.Client(
+        timeout=LLM_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONCURRENCY,
+            max_keepalive_connections=LLM_MAX_CONCURRENCY,
+        ),
+    )
+    llm = ChatGroq(
+        api_key=GROQ_API_KEY,
+        model=LLM_MODEL,
+        base_url=LLM_BASE_URL,
+        timeout=LLM_TIMEOUT,
+        max_retries=0,
+        http_client=http_client,
+    )
+    return GatewayChatModel(llm=llm, gate=RequestGate())
@@ -0,0 +1,162 @@
+import copy
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, List, Optional
+
+from fastapi import HTTPException
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from loguru import logger
+
+from config import (
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_QUEUE_WAIT,
+    LLM_MAX_RETRIES,
+    LLM_RATE_LIMIT,
+)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, max_wait: float | None = None) -> bool:
+        """Take a token, sleeping until it is due. Returns False without taking one
+        when that would mean waiting longer than `max_wait` seconds."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            # tokens go negative for the requests already waiting, so a newcomer
+            # waits for their turns as well
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return False
+            self.tokens -= 1
+        if wait:
+            time.sleep(wait)
+        return True
+
+
+def is_retryable(e: Exception) -> bool:
+    import groq
+
+    if isinstance(e, (groq.APIConnectionError, groq.APITimeoutError)):
+        return True
+    return getattr(e, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def retry_delay(e: Exception, attempt: int) -> float:
+    """Honour the server's Retry-After, else exponential backoff with jitter."""
+    response = getattr(e, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(float(retry_after), 60)
+    except (TypeError, ValueError):
+        return min(0.5 * 2**attempt, 8) * (0.5 + random.random())
+
+
+class RequestGate:
+    """Concurrency limit, rate limit, retries and coalescing of identical requests."""
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        rate_limit: float = LLM_RATE_LIMIT,
+        max_retries: int = LLM_MAX_RETRIES,
+        max_queue_wait: float = LLM_MAX_QUEUE_WAIT,
+    ):
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        # rate_limit is per minute, bursts of up to a tenth of it
+        self.bucket = (
+            TokenBucket(rate_limit / 60, max(1, rate_limit / 10))
+            if rate_limit
+            else None
+        )
+        self.max_retries = max_retries
+        self.max_queue_wait = max_queue_wait
+        self.inflight: dict[str, Future] = {}
+        self.lock = threading.Lock()
+
+    def call(self, key: str, fn):
+        with self.lock:
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.inflight[key] = future
+        if not owner:
+            logger.debug("Coalesced an identical in-flight LLM request")
+            # langchain sets ids and metadata on the returned messages per run
+            return copy.deepcopy(future.result())
+
+        try:
+            future.set_result(self._call_with_retries(fn))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+        return future.result()
+
+    def _call_with_retries(self, fn):
+        for attempt in range(self.max_retries + 1):
+            if self.bucket and not self.bucket.acquire(self.max_queue_wait):
+                # failing fast beats holding a worker thread for minutes
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many requests to the language model, try again",
+                    headers={"Retry-After": str(math.ceil(self.max_queue_wait))},
+                )
+            try:
+                with self.semaphore:
+                    return fn()
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                delay = retry_delay(e, attempt)
+                logger.warning("LLM request failed ({}), retrying in {:.1f}s", e, delay)
+                time.sleep(delay)
+
+
+class GatewayChatModel(BaseChatModel):
+    """Chat model sending every request of the wrapped model through a `RequestGate`."""
+
+    llm: BaseChatModel
+    gate: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return f"gateway-{self.llm._llm_type}"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = json.dumps(
+            [[message.type, message.content] for message in messages] + [stop, kwargs],
+            sort_keys=True,
+            default=str,
+        )
+        return self.gate.call(
+            key, lambda: self.llm._generate(messages, stop=stop, **kwargs)
+        )
@@ -0,0 +1,137 @@
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from config import MEMORY_RECENT_MESSAGES, MEMORY_TOKEN_BUDGET
+from models import ChatMessage, ChatSummary, SessionLocal
+from utils import html_to_text
+
+SUMMARY_TEMPLATE = """Progressively summarize the conversation between a user and an
+assistant answering questions about the user's files. Keep names, numbers, file
+names and open questions. Use at most {max_words} words.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{lines}
+
+New summary:"""
+
+
+def estimate_tokens(text: str) -> int:
+    # about four characters per token for English, good enough for a budget
+    return len(text) // 4 + 1
+
+
+def truncate_tokens(text: str, tokens: int) -> str:
+    return text if estimate_tokens(text) <= tokens else text[: tokens * 4] + "..."
+
+
+def chunk_lines(lines: list[str], budget: int) -> list[list[str]]:
+    """Consecutive runs of `lines` of at most about `budget` tokens each."""
+    chunks = [[]]
+    used = 0
+    for line in lines:
+        line = truncate_tokens(line, budget)
+        tokens = estimate_tokens(line)
+        if chunks[-1] and used + tokens > budget:
+            chunks.append([])
+            used = 0
+        chunks[-1].append(line)
+        used += tokens
+    return chunks
+
+
+def message_line(message: ChatMessage) -> str:
+    if message.type == "human":
+        return f"User: {message.content}"
+    return f"Assistant: {html_to_text(message.content)}"
+
+
+def unsummarized_messages(db: Session, chat_id: int, summary: ChatSummary | None):
+    last_message_id = summary.last_message_id if summary else 0
+    return (
+        db.query(ChatMessage)
+        .filter(ChatMessage.chat_id == chat_id, ChatMessage.id > last_message_id)
+        .order_by(ChatMessage.id)
+        .all()
+    )
+
+
+def load_history(db: Session, chat_id: int, budget: int = MEMORY_TOKEN_BUDGET) -> str:
+    """Summary plus the newest raw messages, as plain text within `budget` tokens."""
+    summary = db.query(ChatSummary).filter(ChatSummary.chat_id == chat_id).first()
+    lines = []
+    used = 0
+    if summary and summary.content:
+        # bounded even when the LLM ignored max_words
+        content = truncate_tokens(summary.content, budget // 2)
+        lines.append(f"Summary of the earlier conversation: {content}")
+        used += estimate_tokens(lines[0])
+
+    recent = []
+    # the summary may lag behind by a turn, the budget still bounds the prompt
+    for message in reversed(unsummarized_messages(db, chat_id, summary)):
+        # one long answer must not crowd out the messages before it
+        line = truncate_tokens(message_line(message), max(budget // 2, 1))
+        tokens = estimate_tokens(line)
+        if used + tokens > budget:
+            if not recent:
+                # the newest message is always kept, cut to what is left
+                recent.append(truncate_tokens(line, max(budget - used, 1)))
+            break
+        used += tokens
+        recent.append(line)
+
+    return "\n".join(lines + recent[::-1])
+
+
+def update_summary(
+    chat_id: int,
+    llm,
+    budget: int = MEMORY_TOKEN_BUDGET,
+    keep: int = MEMORY_RECENT_MESSAGES,
+):
+    """Fold the messages older than the newest `keep` into the chat summary.
+
+    Only runs once the unsummarized messages take more than half the budget, so most
+    turns cost no extra LLM call. Runs after the response with its own session."""
+    from langchain.prompts import ChatPromptTemplate
+    from langchain.schema.output_parser import StrOutputParser
+
+    db = SessionLocal()
+    try:
+        summary = db.query(ChatSummary).filter(ChatSummary.chat_id == chat_id).first()
+        messages = unsummarized_messages(db, chat_id, summary)
+        lines = [message_line(message) for message in messages]
+        if len(messages) <= keep or estimate_tokens("\n".join(lines)) <= budget // 2:
+            return
+
+        fold = messages[:-keep] if keep else messages
+        chain = (
+            ChatPromptTemplate.from_template(SUMMARY_TEMPLATE) | llm | StrOutputParser()
+        )
+        if summary is None:
+            summary = ChatSummary(chat_id=chat_id, content="")
+            db.add(summary)
+
+        # folded a budget's worth at a time so a long backlog of messages never
+        # becomes one huge prompt, progress is kept if a later chunk fails
+        folded = 0
+        for chunk in chunk_lines(lines[: len(fold)], budget):
+            summary.content = chain.invoke(
+                {
+                    "max_words": budget // 4,
+                    "summary": truncate_tokens(summary.content, budget // 2),
+                    "lines": "\n".join(chunk),
+                }
+            ).strip()
+            folded += len(chunk)
+            summary.last_message_id = fold[folded - 1].id
+            db.commit()
+        logger.info("Summarized {} messages of chat {}", len(fold), chat_id)
+    except Exception as e:
+        # the raw messages are still used, the next turn retries
+        logger.error("Could not update summary of chat {}: {}", chat_id, e)
+    finally:
+        db.close()
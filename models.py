@@ -10,10 +10,14 @@ from sqlalchemy import (
     ForeignKey,
     Text,
     create_engine,
+    inspect,
+    text,
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 
+from config import DATABASE_URL
+
 Base = declarative_base()
 
 
@@ -51,6 +55,8 @@ class File(Base):
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     embeddings_path = Column(String, nullable=False)
+    content_hash = Column(String, index=True)  # sha256 of the stored blob
+    size = Column(Integer, nullable=False, default=0)
     user = relationship("User", back_populates="files")
 
 
@@ -68,6 +74,12 @@ class Chat(Base):
     messages = relationship(
         "ChatMessage", back_populates="chat", cascade="all, delete-orphan"
     )
+    summary = relationship(
+        "ChatSummary",
+        back_populates="chat",
+        cascade="all, delete-orphan",
+        uselist=False,
+    )
     user = relationship("User", back_populates="chats")
 
 
@@ -84,8 +96,20 @@ class ChatMessage(Base):
     chat = relationship("Chat", back_populates="messages")
 
 
-DATABASE_URL = "sqlite:///./app.db"
-if not os.path.exists("app.db"):
+# Rolling summary of the messages of a chat up to and including last_message_id
+class ChatSummary(Base):
+    __tablename__ = "chat_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(Integer, ForeignKey("chats.id"), unique=True, nullable=False)
+    content = Column(Text, nullable=False, default="")
+    last_message_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    chat = relationship("Chat", back_populates="summary")
+
+
+if DATABASE_URL == "sqlite:///./app.db" and not os.path.exists("app.db"):
     with open("app.db", "w") as f:
         pass
 engine = create_engine(DATABASE_URL)
@@ -94,6 +118,16 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Initialize database
 Base.metadata.create_all(bind=engine)
 
+# create_all does not add columns or their indexes to existing tables
+file_columns = {column["name"] for column in inspect(engine).get_columns("files")}
+with engine.begin() as connection:
+    for name, ddl in (("content_hash", "VARCHAR"), ("size", "INTEGER DEFAULT 0")):
+        if name not in file_columns:
+            connection.execute(text(f"ALTER TABLE files ADD COLUMN {name} {ddl}"))
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_files_content_hash ON files (content_hash)")
+    )
+
 
 # Dependency to get database session
 def get_db():
@@ -0,0 +1,140 @@
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from loguru import logger
+
+from config import PARSE_PAGES_PER_TASK, PARSE_WORKERS, PARSED_DIR
+
+
+def file_hash(file_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def get_pool() -> ProcessPoolExecutor:
+    # spawn, forking a process running server threads is not safe
+    return ProcessPoolExecutor(
+        max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def parse_pdf_pages(file_path: str, start: int, stop: int) -> list[tuple[int, str]]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    return [(i, reader.pages[i].extract_text()) for i in range(start, stop)]
+
+
+def parse_xlsx_sheet(file_path: str, sheet_name: str) -> str:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        lines = []
+        for row in workbook[sheet_name].iter_rows(values_only=True):
+            cells = ["" if value is None else str(value) for value in row]
+            if any(cells):
+                lines.append("\t".join(cells))
+        return "\n".join(lines)
+    finally:
+        workbook.close()
+
+
+def parse_pdf(file_path: str) -> list[tuple[str, dict]]:
+    """One document per page, like PyPDFLoader, with page ranges parsed in parallel."""
+    from pypdf import PdfReader
+
+    pages = len(PdfReader(file_path).pages)
+    ranges = [
+        (start, min(start + PARSE_PAGES_PER_TASK, pages))
+        for start in range(0, pages, PARSE_PAGES_PER_TASK)
+    ]
+    if len(ranges) > 1 and PARSE_WORKERS > 1:
+        futures = [
+            get_pool().submit(parse_pdf_pages, file_path, start, stop)
+            for start, stop in ranges
+        ]
+        results = [page for future in futures for page in future.result()]
+    else:
+        results = parse_pdf_pages(file_path, 0, pages)
+    return [(text, {"source": file_path, "page": page}) for page, text in results]
+
+
+def parse_xlsx(file_path: str) -> list[tuple[str, dict]]:
+    """One document per sheet, sheets parsed in parallel."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True)
+    sheet_names = workbook.sheetnames
+    workbook.close()
+    if len(sheet_names) > 1 and PARSE_WORKERS > 1:
+        futures = [
+            get_pool().submit(parse_xlsx_sheet, file_path, name) for name in sheet_names
+        ]
+        texts = [future.result() for future in futures]
+    else:
+        texts = [parse_xlsx_sheet(file_path, name) for name in sheet_names]
+    return [
+        (text, {"source": file_path, "sheet": name})
+        for name, text in zip(sheet_names, texts)
+        if text
+    ]
+
+
+def parse_with_loader(file_path: str) -> list[tuple[str, dict]]:
+    from utils import load_file
+
+    return [(doc.page_content, doc.metadata) for doc in load_file(file_path)]
+
+
+PARSERS = {
+    "pdf": parse_pdf,
+    "xlsx": parse_xlsx,
+}
+
+
+def parse_file(file_path: str, content_hash: str | None = None):
+    """Extracted text of a file as documents, cached under PARSED_DIR by content hash.
+
+    Parsing only depends on the file's bytes, so re-uploads and re-indexing with
+    another model or chunk size reuse the cached text."""
+    from langchain_core.documents import Document
+
+    extension = file_path.split(".")[-1].lower()
+    content_hash = content_hash or file_hash(file_path)
+    cache_path = os.path.join(PARSED_DIR, f"{content_hash}.{extension}.json")
+
+    if os.path.exists(cache_path):
+        logger.info("Using parsed text cache for {}", file_path)
+        with open(cache_path) as f:
+            parsed = json.load(f)
+    else:
+        parsed = PARSERS.get(extension, parse_with_loader)(file_path)
+        os.makedirs(PARSED_DIR, exist_ok=True)
+        # written to a temporary file first so readers never see a partial cache,
+        # unique per call as threads of one worker may parse the same content
+        fd, tmp_path = tempfile.mkstemp(dir=PARSED_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(parsed, f)
+        os.replace(tmp_path, cache_path)
+
+    return [
+        Document(page_content=text, metadata={**metadata, "source": file_path})
+        for text, metadata in parsed
+    ]
+
+
+def remove_parsed(content_hash: str):
+    """Drop the cached text of a file, once no stored file has that content."""
+    for cache_path in glob.glob(os.path.join(PARSED_DIR, f"{content_hash}.*.json")):
+        os.remove(cache_path)
@@ -0,0 +1,76 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import lru_cache
+
+from loguru import logger
+
+from config import RERANK_BUDGET_MS, RERANK_MODEL
+
+# scoring runs here so a request can stop waiting once its budget is spent
+WORKERS = 2
+executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="rerank")
+# one per worker, requests skip reranking rather than queue behind busy workers
+slots = threading.BoundedSemaphore(WORKERS)
+# pairs scored between deadline checks, a late job frees its worker after one batch
+SCORE_BATCH_SIZE = 8
+
+
+@lru_cache(maxsize=None)
+def get_cross_encoder():
+    from sentence_transformers import CrossEncoder
+
+    logger.info("Loading rerank model {}", RERANK_MODEL)
+    return CrossEncoder(RERANK_MODEL, max_length=512)
+
+
+def score(query: str, docs, deadline: float | None = None) -> list[float] | None:
+    """Cross-encoder scores of `docs`, None once `deadline` (monotonic) has passed."""
+    pairs = [(query, doc.page_content) for doc in docs]
+    scores = []
+    for start in range(0, len(pairs), SCORE_BATCH_SIZE):
+        if deadline is not None and time.monotonic() > deadline:
+            return None
+        batch = pairs[start : start + SCORE_BATCH_SIZE]
+        scores.extend(
+            get_cross_encoder().predict(batch, batch_size=SCORE_BATCH_SIZE).tolist()
+        )
+    return scores
+
+
+def rerank(query: str, docs, k: int, budget_ms: float = RERANK_BUDGET_MS):
+    """Best `k` of `docs` by cross-encoder score.
+
+    Falls back to the vector search order when scoring fails or takes longer than
+    `budget_ms`, or when both workers are still busy with earlier requests, the
+    chunks are still relevant, just ranked less precisely."""
+    if not RERANK_MODEL or len(docs) <= 1:
+        return docs[:k]
+
+    try:
+        # loaded outside the budget, the first request would always fall back
+        # otherwise, set WARMUP to load it at startup instead
+        get_cross_encoder()
+    except Exception as e:
+        logger.error("Loading the rerank model failed: {}", e)
+        return docs[:k]
+    if not slots.acquire(blocking=False):
+        logger.warning("Reranking workers busy, using the vector search order")
+        return docs[:k]
+    deadline = time.monotonic() + budget_ms / 1000
+    future = executor.submit(score, query, docs, deadline)
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        # the job itself stops at its next batch once the deadline has passed
+        scores = future.result(timeout=budget_ms / 1000)
+    except TimeoutError:
+        logger.warning("Reranking {} chunks took over {}ms", len(docs), budget_ms)
+        return docs[:k]
+    except Exception as e:
+        logger.error("Reranking failed: {}", e)
+        return docs[:k]
+    if scores is None:  # the deadline passed just as the job noticed it
+        return docs[:k]
+
+    ranked = sorted(zip(scores, docs), key=lambda pair: pair[0], reverse=True)
+    return [doc for _, doc in ranked[:k]]
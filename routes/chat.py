@@ -1,25 +1,18 @@
-import os
 from typing import Optional
-from fastapi import APIRouter, Depends, Form, Path, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, Path, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_groq import ChatGroq
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 from loguru import logger
 from sqlalchemy.orm import Session
 
-from config import EMBEDDINGS_DIR, EMBEDDINGS_MODEL, GROQ_API_KEY
+from config import RETRIEVER_K
 from cookies import get_current_user
+from llm import get_chat_model
+from memory import load_history, update_summary
 from models import Chat, ChatMessage, File, get_db
 from utils import render_markdown_safely
+from vectorstore import get_vector_store
 
-
-chat_model = ChatGroq(
-    api_key=GROQ_API_KEY,
-    model="llama3-8b-8192",
-)
 router = APIRouter(prefix="/chat")
 templates = Jinja2Templates(directory="templates")
 
@@ -147,11 +140,6 @@ def chat_list_latest(
     )
 
 
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema.output_parser import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-
-
 @router.post("/", response_class=HTMLResponse)
 def new_chat(
     chat_id: int = Form(...),
@@ -159,15 +147,19 @@ def new_chat(
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user),
     request: Request = None,
+    background_tasks: BackgroundTasks = None,
 ):
-    embeddings_model = HuggingFaceEmbeddings(model_name=EMBEDDINGS_MODEL)
+    from langchain.prompts import ChatPromptTemplate
+    from langchain.schema.output_parser import StrOutputParser
+    from langchain_core.runnables import RunnablePassthrough
+
+    chat_model = get_chat_model()
     chat = None
     if chat_id != -1:
         chat = (
             db.query(Chat).filter(Chat.id == chat_id, Chat.user_id == user_id).first()
         )
     else:
-        llm = ChatGroq(model="llama3-8b-8192")
         prompt = ChatPromptTemplate.from_template(
             f""""
             This is the user question : {query}
@@ -175,36 +167,27 @@ def new_chat(
             RETURN ONLY TITLE
             """
         )
-        llm_chain = prompt | llm | StrOutputParser()
+        llm_chain = prompt | chat_model | StrOutputParser()
         title = llm_chain.invoke({"query": query}).strip('"').strip("'")
         logger.info("Title: {}", title)
         chat = Chat(user_id=user_id, title=title)
         db.add(chat)
         db.commit()
         db.refresh(chat)
-    # get latest 5 chats
-    chat_history = (
-        db.query(ChatMessage)
-        .filter(ChatMessage.chat_id == chat.id)
-        .order_by(ChatMessage.created_at.desc())
-        .limit(2)
-        .all()
-    )
-
-    embeddings_path = os.path.join(EMBEDDINGS_DIR, str(user_id), "vectorstore.faiss")
-    vectorstore = FAISS.load_local(
-        embeddings_path, embeddings_model, allow_dangerous_deserialization=True
-    )
+    # rolling summary plus the latest messages, as plain text
+    chat_history = load_history(db, chat.id)
 
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
+    # retrieve once, the documents feed both the prompt and the source link
+    matched_docs = get_vector_store().search(user_id, query, RETRIEVER_K)
 
     from langchain.text_splitter import TokenTextSplitter
 
     def format_docs(docs):
         text_splitter = TokenTextSplitter(chunk_size=2000, chunk_overlap=0)
         combined_content = "\n\n".join(doc.page_content for doc in docs)
-        truncated_content = text_splitter.split_text(combined_content)[0]
-        print(truncated_content)
+        # an index whose files were all deleted has no chunks left
+        truncated_content = next(iter(text_splitter.split_text(combined_content)), "")
+        logger.debug("Context: {}", truncated_content)
         return truncated_content
 
     template = """Answer the question based on the following context and chat history:
@@ -214,19 +197,11 @@ def new_chat(
     """
 
     prompt = ChatPromptTemplate.from_template(template)
-    print(chat_history)
 
     chain = (
         {
-            "context": retriever | format_docs,
-            "chat_history": lambda _: [
-                (
-                    HumanMessage(content=f"{message.content}")
-                    if message.type == "human"
-                    else AIMessage(content=message.content)
-                )
-                for message in chat_history
-            ],
+            "context": lambda _: format_docs(matched_docs),
+            "chat_history": lambda _: chat_history,
             "question": RunnablePassthrough(),
         }
         | prompt
@@ -235,7 +210,6 @@ def new_chat(
     )
 
     result = chain.invoke(query)
-    matched_docs = retriever.get_relevant_documents(query)
     matched_file = (
         matched_docs[0].metadata.get("file_name", "Unknown File")
         if matched_docs
@@ -259,6 +233,7 @@ def new_chat(
         )
     )
     db.commit()
+    background_tasks.add_task(update_summary, chat.id, chat_model)
 
     return (
         templates.TemplateResponse(
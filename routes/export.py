@@ -0,0 +1,138 @@
+import csv
+import json
+import zlib
+from io import StringIO
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from cookies import get_current_user
+from models import Chat, ChatMessage, SessionLocal
+
+router = APIRouter(prefix="/export")
+
+# rows fetched from the database and written to the response at a time
+BATCH_SIZE = 500
+
+FIELDS = [
+    "chat_id",
+    "chat_title",
+    "message_id",
+    "type",
+    "content",
+    "source_file",
+    "created_at",
+]
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def iter_rows(user_id: int):
+    """Messages of all the user's chats, streamed from the database in batches.
+
+    A chat without messages still gets one row, with empty message fields."""
+    # the request's session is closed before the response body is streamed
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(
+                Chat.id,
+                Chat.title,
+                ChatMessage.id,
+                ChatMessage.type,
+                ChatMessage.content,
+                ChatMessage.source_file,
+                ChatMessage.created_at,
+            )
+            .outerjoin(ChatMessage, ChatMessage.chat_id == Chat.id)
+            .filter(Chat.user_id == user_id)
+            .order_by(Chat.id, ChatMessage.id)
+            .yield_per(BATCH_SIZE)
+        )
+        for row in query:
+            row = dict(zip(FIELDS, row))
+            if row["created_at"]:
+                row["created_at"] = row["created_at"].isoformat()
+            yield row
+    finally:
+        db.close()
+
+
+def iter_json(rows):
+    yield "["
+    separator = ""
+    for row in rows:
+        yield separator + json.dumps(row)
+        separator = ","
+    yield "]"
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+def iter_csv(rows):
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    # on its own, so an export without messages still has the header
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def batched(chunks):
+    """Join small chunks so the response is written in reasonably sized pieces."""
+    pending = []
+    for i, chunk in enumerate(chunks, start=1):
+        pending.append(chunk)
+        if i % BATCH_SIZE == 0:
+            yield "".join(pending).encode()
+            pending = []
+    if pending:
+        yield "".join(pending).encode()
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/chat")
+def export_chat(
+    type: Literal["json", "csv", "ndjson"],
+    gzip: bool = False,
+    user_id: int = Depends(get_current_user),
+):
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    writers = {"json": iter_json, "csv": iter_csv, "ndjson": iter_ndjson}
+    body = batched(writers[type](iter_rows(user_id)))
+    filename = f"chat_export.{type}"
+    media_type = MEDIA_TYPES[type]
+    if gzip:
+        body = gzipped(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
@@ -1,17 +1,25 @@
 import os
-import shutil
-from fastapi import APIRouter, Depends, Form, Request, UploadFile
+from fastapi import APIRouter, Depends, Form, HTTPException, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from langchain_huggingface import HuggingFaceEmbeddings
 from loguru import logger
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from langchain_community.vectorstores import FAISS
+from starlette.concurrency import run_in_threadpool
 
-from config import EMBEDDINGS_DIR, EMBEDDINGS_MODEL, UPLOAD_DIR
+from config import UPLOAD_MAX_BYTES, UPLOAD_QUOTA_BYTES
 from cookies import get_current_user
 from models import File, get_db
-from utils import process_file
+from storage import (
+    ReceivedFile,
+    receive_upload,
+    release_blob,
+    stage_blob,
+    store_blob,
+    user_file_path,
+)
+from utils import get_loader_for_file, process_file
+from vectorstore import get_vector_store
 
 templates = Jinja2Templates(directory="templates")
 router = APIRouter(prefix="/upload")
@@ -33,48 +41,97 @@ def upload_page(
 
 
 @router.post("/", response_class=HTMLResponse)
-def upload_file(
-    file: UploadFile,
+async def upload_file(
+    request: Request,
     db: Session = Depends(get_db),
     user_id: int | None = Depends(get_current_user),
-    request: Request = None,
 ):
     if not user_id:
         return RedirectResponse("/login", status_code=302)
 
-    # Create user-specific directory
-    user_upload_dir = os.path.join(UPLOAD_DIR, str(user_id))
-    os.makedirs(user_upload_dir, exist_ok=True)
-
-    # Save file in user's directory
-    file_path = os.path.join(user_upload_dir, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # Create user-specific embeddings directory
-    user_embeddings_dir = os.path.join(EMBEDDINGS_DIR, str(user_id))
-    os.makedirs(user_embeddings_dir, exist_ok=True)
-    print(user_embeddings_dir, user_upload_dir)
-    embeddings_path = process_file(
-        file_path,
-        user_id=user_id,
-        file_name=file.filename,
-        embeddings_dir=EMBEDDINGS_DIR,
-    )
-
-    uploaded_file = File(
-        user_id=user_id,
-        filename=file.filename,
-        file_path=file_path,
-        embeddings_path=embeddings_path,
-    )
-    db.add(uploaded_file)
-    db.commit()
+    max_bytes = UPLOAD_MAX_BYTES
+    if UPLOAD_QUOTA_BYTES:
+        used = await run_in_threadpool(used_bytes, db, user_id)
+        max_bytes = min(max_bytes, UPLOAD_QUOTA_BYTES - used)
+        if max_bytes <= 0:
+            raise HTTPException(status_code=413, detail="Upload quota exceeded")
+
+    upload = await receive_upload(request, max_bytes)
+    uploaded_file, created = await run_in_threadpool(save_upload, db, user_id, upload)
+    if not created:
+        # the file list already shows it
+        return HTMLResponse("")
     return templates.TemplateResponse(
         "partials/file_row.html",
         {"request": request, "file": uploaded_file},
         headers={"Content-Type": "text/html"},
-    ).body
+    )
+
+
+def used_bytes(db: Session, user_id: int) -> int:
+    return (
+        db.query(func.coalesce(func.sum(File.size), 0))
+        .filter(File.user_id == user_id)
+        .scalar()
+    )
+
+
+def save_upload(db: Session, user_id: int, upload: ReceivedFile) -> tuple[File, bool]:
+    """Store and index an upload, returns its row and whether the row is new.
+
+    The new content is indexed before it replaces anything, so a file that fails to
+    parse leaves a previous file of the same name untouched. Content the user or
+    others already uploaded shares its blob and parsed text."""
+    if not get_loader_for_file(upload.filename):
+        os.remove(upload.path)
+        raise HTTPException(
+            status_code=415, detail=f"Unsupported file type: {upload.filename}"
+        )
+
+    replaced = (
+        db.query(File)
+        .filter(File.user_id == user_id, File.filename == upload.filename)
+        .first()
+    )
+    if replaced and replaced.content_hash == upload.content_hash:
+        logger.info("{} is already indexed", upload.filename)
+        os.remove(upload.path)
+        return replaced, False
+
+    file_path = user_file_path(user_id, upload.filename)
+    blob_path = store_blob(upload.path, upload.content_hash)
+    staged_path = stage_blob(blob_path, user_id, upload.filename)
+    try:
+        embeddings_path = process_file(
+            staged_path,
+            user_id=user_id,
+            file_name=upload.filename,
+            content_hash=upload.content_hash,
+            source=file_path,
+        )
+        uploaded_file = replaced or File(user_id=user_id, filename=upload.filename)
+        old_hash = replaced.content_hash if replaced else None
+        uploaded_file.file_path = file_path
+        uploaded_file.embeddings_path = embeddings_path
+        uploaded_file.content_hash = upload.content_hash
+        uploaded_file.size = upload.size
+        db.add(uploaded_file)
+        db.commit()
+    except Exception:
+        db.rollback()
+        os.remove(staged_path)
+        release_blob(upload.content_hash)
+        raise
+    os.replace(staged_path, file_path)
+
+    if replaced:
+        # Same name with new content: the old chunks and blob are stale now
+        get_vector_store().delete_file(
+            user_id, upload.filename, keep_hash=upload.content_hash
+        )
+        if old_hash:
+            release_blob(old_hash)
+    return uploaded_file, replaced is None
 
 
 @router.delete("/", response_class=HTMLResponse)
@@ -83,49 +140,16 @@ def delete_file(
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user),
 ):
-    embeddings_model = HuggingFaceEmbeddings(model_name=EMBEDDINGS_MODEL)
     file = db.query(File).filter(File.id == file_id, File.user_id == user_id).first()
     if not file:
         return ""
 
-    # Delete physical file
-
-    # Load and update FAISS index
-    embeddings_path = str(file.embeddings_path)
-
-    if os.path.exists(embeddings_path):
-        print(f"Loading embeddings from {embeddings_path}")
-        vectorstore = FAISS.load_local(
-            embeddings_path, embeddings_model, allow_dangerous_deserialization=True
-        )
-        # Filter out embeddings for this file
-        filtered_docs = [
-            doc
-            for doc in vectorstore.docstore._dict.values()
-            if doc.metadata.get("file_name") != file.filename
-        ]
-        logger.info(
-            "Files {} ",
-            set(
-                [
-                    doc.metadata.get("file_name")
-                    for doc in vectorstore.docstore._dict.values()
-                ]
-            ),
-        )
-        logger.info(
-            "Filtered Files : {}",
-            set([doc.metadata.get("file_name") for doc in filtered_docs]),
-        )
-        # filtered_docs = filtered_docs if len(filtered_docs) > 0 else ["dummy"]
-        if len(filtered_docs) > 0:
-            new_vectorstore = FAISS.from_documents(filtered_docs, embeddings_model)
-            new_vectorstore.save_local(embeddings_path)
-        else:
-            new_vectorstore = FAISS.from_texts(["dummy"], embeddings_model)
-            new_vectorstore.save_local(embeddings_path)
+    # Remove the file's chunks from the user's index
+    get_vector_store().delete_file(user_id, file.filename)
     if os.path.exists(file.file_path):
         os.remove(file.file_path)
+    if file.content_hash:
+        release_blob(file.content_hash)
     db.delete(file)
     db.commit()
 
@@ -0,0 +1,173 @@
+"""Content addressed storage of uploaded files.
+
+Every distinct file is stored once as UPLOAD_DIR/blobs/<sha256>. Users get a hard
+link to it at UPLOAD_DIR/<user_id>/<filename>, which is what /uploads serves.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request
+from loguru import logger
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from config import UPLOAD_DIR
+from parsing import remove_parsed
+
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+# room for the multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+@dataclass
+class ReceivedFile:
+    filename: str
+    path: str  # temporary file, moved into the blob store by store_blob
+    content_hash: str
+    size: int
+
+
+def too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413, detail=f"File exceeds the limit of {max_bytes} bytes"
+    )
+
+
+async def receive_upload(
+    request: Request, max_bytes: int, field: str = "file"
+) -> ReceivedFile:
+    """Stream the `field` file of a multipart request to disk, hashing as it arrives.
+
+    Requests that announce a larger body are refused before reading it, others are
+    cut off as soon as the file passes `max_bytes`."""
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data")
+    content_length = request.headers.get("content-length")
+    if content_length and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise too_large(max_bytes)
+
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=BLOB_DIR, suffix=".part")
+    sha256 = hashlib.sha256()
+    state = {"headers": {}, "field": b"", "value": b"", "filename": None}
+    pending = []  # file data of the current chunk, written outside the event loop
+
+    def on_part_begin():
+        state["headers"] = {}
+
+    def on_header_field(data, start, end):
+        state["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["field"].lower()] = state["value"]
+        state["field"] = state["value"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(
+            state["headers"].get(b"content-disposition", b"")
+        )
+        state["receiving"] = (
+            options.get(b"name") == field.encode()
+            and b"filename" in options
+            and state["filename"] is None
+        )
+        if state["receiving"]:
+            filename = os.path.basename(options[b"filename"].decode())
+            state["filename"] = "" if filename in (".", "..") else filename
+
+    def on_part_data(data, start, end):
+        if state["receiving"]:
+            pending.append(data[start:end])
+
+    def write_pending(f, size):
+        for block in pending:
+            size += len(block)
+            if size > max_bytes:
+                raise too_large(max_bytes)
+            sha256.update(block)
+            f.write(block)
+        pending.clear()
+        return size
+
+    parser = MultipartParser(
+        params[b"boundary"],
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+        },
+    )
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if pending:
+                    size = await run_in_threadpool(write_pending, f, size)
+            parser.finalize()
+        if not state["filename"]:
+            raise HTTPException(status_code=400, detail=f"No file in field {field}")
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    return ReceivedFile(state["filename"], tmp_path, sha256.hexdigest(), size)
+
+
+def store_blob(tmp_path: str, content_hash: str) -> str:
+    """Move a received file into the blob store, dropping it if already stored."""
+    blob_path = os.path.join(BLOB_DIR, content_hash)
+    if os.path.exists(blob_path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, blob_path)
+    return blob_path
+
+
+def user_file_path(user_id: int, filename: str) -> str:
+    return os.path.join(UPLOAD_DIR, str(user_id), filename)
+
+
+def stage_blob(blob_path: str, user_id: int, filename: str) -> str:
+    """Link a blob next to the user's file under a hidden name with the same
+    extension, so it can be parsed before os.replace makes it the user's file."""
+    file_path = user_file_path(user_id, filename)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    staged_path = os.path.join(
+        os.path.dirname(file_path), f".{uuid.uuid4().hex}.{filename}"
+    )
+    try:
+        os.link(blob_path, staged_path)
+    except OSError:
+        # no hard links on this filesystem, fall back to a copy
+        shutil.copyfile(blob_path, staged_path)
+    return staged_path
+
+
+def release_blob(content_hash: str):
+    """Remove a blob and its parsed text once no user file links to it any more."""
+    blob_path = os.path.join(BLOB_DIR, content_hash)
+    try:
+        if os.stat(blob_path).st_nlink > 1:
+            return
+        os.remove(blob_path)
+        logger.info("Removed unreferenced blob {}", content_hash)
+    except FileNotFoundError:
+        pass
+    remove_parsed(content_hash)
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# a throwaway database, models creates its tables on import
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+)
+
+from memory import estimate_tokens, load_history  # noqa: E402
+from models import Chat, ChatMessage, ChatSummary, SessionLocal  # noqa: E402
+
+
+def make_chat(db, messages, summary=None):
+    chat = Chat(user_id=1, title="test")
+    db.add(chat)
+    db.commit()
+    for type, content in messages:
+        db.add(ChatMessage(chat_id=chat.id, type=type, content=content))
+    if summary:
+        db.add(ChatSummary(chat_id=chat.id, content=summary))
+    db.commit()
+    return chat.id
+
+
+def test_long_answer_is_truncated_not_dropped():
+    db = SessionLocal()
+    chat_id = make_chat(
+        db,
+        [
+            ("human", "What does the report say about revenue?"),
+            ("ai", "<p>" + "Revenue grew in every region. " * 190 + "</p>"),
+        ],
+    )
+
+    history = load_history(db, chat_id, budget=1000)
+
+    assert "User: What does the report say about revenue?" in history
+    assert "Assistant: Revenue grew in every region." in history
+    assert estimate_tokens(history) <= 1000 + 10
+    db.close()
+
+
+def test_newest_message_kept_after_a_long_summary():
+    db = SessionLocal()
+    chat_id = make_chat(
+        db, [("human", "And the costs? " * 400)], summary="Talked about it. " * 400
+    )
+
+    history = load_history(db, chat_id, budget=200)
+
+    assert history.startswith("Summary of the earlier conversation: Talked about")
+    assert "User: And the costs?" in history
+    assert estimate_tokens(history) <= 200 + 10
+    db.close()
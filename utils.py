@@ -1,56 +1,67 @@
 from datetime import datetime
-import os
-from langchain_community.document_loaders import (
-    TextLoader,
-    PyPDFLoader,
-    CSVLoader,
-    Docx2txtLoader,
-    UnstructuredExcelLoader,
-    UnstructuredMarkdownLoader,
-)
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import html
+from config import CHUNK_OVERLAP, CHUNK_SIZE
+from vectorstore import get_vector_store
+
+# loader class names, imported on first use as langchain_community is slow to import
+LOADERS = {
+    "txt": "TextLoader",
+    "pdf": "PyPDFLoader",
+    "csv": "CSVLoader",
+    "docx": "Docx2txtLoader",
+    "xlsx": "UnstructuredExcelLoader",
+    "xls": "UnstructuredExcelLoader",
+    "md": "UnstructuredMarkdownLoader",
+}
 
 
-from langchain_community.vectorstores import FAISS
+def get_loader_for_file(file_path: str):
+    file_extension = file_path.split(".")[-1].lower()
 
-from config import EMBEDDINGS_MODEL
+    loader_name = LOADERS.get(file_extension)
+    if not loader_name:
+        return None
 
+    from langchain_community import document_loaders
 
-def get_loader_for_file(file_path: str):
-    file_extension = file_path.split(".")[-1].lower()
+    return getattr(document_loaders, loader_name)
 
-    loaders = {
-        "txt": TextLoader,
-        "pdf": PyPDFLoader,
-        "csv": CSVLoader,
-        "docx": Docx2txtLoader,
-        "xlsx": UnstructuredExcelLoader,
-        "xls": UnstructuredExcelLoader,
-        "md": UnstructuredMarkdownLoader,
-    }
-
-    return loaders.get(file_extension)
-
-
-def process_file(file_path: str, user_id: int, file_name: str, embeddings_dir: str):
-    embeddings_model = HuggingFaceEmbeddings(model_name=EMBEDDINGS_MODEL)
-    """Processes multiple file types, generates embeddings with metadata, and stores them."""
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
+
+def get_text_splitter(chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
         length_function=len,
         separators=["\n\n", "\n", " ", ""],
     )
 
+
+def load_file(file_path: str):
     # Get appropriate loader
     LoaderClass = get_loader_for_file(file_path)
     if not LoaderClass:
         raise ValueError(f"Unsupported file type: {file_path}")
 
     loader = LoaderClass(file_path)
-    raw_documents = loader.load()
-    documents = text_splitter.split_documents(raw_documents)
+    return loader.load()
+
+
+def process_file(
+    file_path: str,
+    user_id: int,
+    file_name: str,
+    content_hash: str | None = None,
+    source: str | None = None,
+):
+    """Processes multiple file types, generates embeddings with metadata, and stores them.
+
+    `source` is the path recorded in the chunks when `file_path` is a staged copy."""
+    from parsing import parse_file
+
+    raw_documents = parse_file(file_path, content_hash=content_hash)
+    documents = get_text_splitter().split_documents(raw_documents)
     logger.info(f"File Name {file_name}")
     logger.info(f"Documents {len(documents)}")
     for i, doc in enumerate(documents):
@@ -58,25 +69,12 @@ def process_file(file_path: str, user_id: int, file_name: str, embeddings_dir: s
             "user_id": user_id,
             "file_name": file_name,
             "chunk_id": i,
-            "source": file_path,
+            "content_hash": content_hash,
+            "source": source or file_path,
             "created_at": datetime.now().isoformat(),
         }
 
-    user_embeddings_dir = os.path.join(embeddings_dir, str(user_id))
-    os.makedirs(user_embeddings_dir, exist_ok=True)
-
-    embeddings_path = os.path.join(user_embeddings_dir, "vectorstore.faiss")
-    if os.path.exists(embeddings_path):
-        vectorstore = FAISS.load_local(
-            embeddings_path, embeddings_model, allow_dangerous_deserialization=True
-        )
-        vectorstore.add_documents(documents)
-
-    else:
-        vectorstore = FAISS.from_documents(documents, embeddings_model)
-
-    vectorstore.save_local(embeddings_path)
-    return embeddings_path
+    return get_vector_store().add_documents(user_id, documents)
 
 
 from loguru import logger
@@ -114,3 +112,8 @@ def render_markdown_safely(content: str) -> str:
         html, tags=allowed_tags, attributes=allowed_attributes, strip=True
     )
     return clean_html
+
+
+def html_to_text(content: str) -> str:
+    """Plain text of a message stored as rendered HTML."""
+    return html.unescape(bleach.clean(content, tags=[], strip=True)).strip()
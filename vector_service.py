@@ -0,0 +1,89 @@
+"""Shared vector search service for multi-worker deployments.
+
+Owns the embedding model and the per-user FAISS indexes so they are loaded once
+per host instead of once per web worker. Run a single worker of it:
+
+    uvicorn vector_service:app --uds /tmp/file-chat-vectors.sock
+
+and point the web workers at it with
+VECTOR_SERVICE_URL=unix:///tmp/file-chat-vectors.sock
+
+Requests carry any user_id, so both sides need the same VECTOR_SERVICE_TOKEN, the
+service refuses every request without it.
+"""
+
+import hmac
+from typing import Any
+
+from fastapi import Depends, FastAPI, Header, HTTPException
+from pydantic import BaseModel
+
+from config import VECTOR_SERVICE_TOKEN
+from vectorstore import LocalVectorStore
+
+
+def check_token(authorization: str = Header("")):
+    expected = f"Bearer {VECTOR_SERVICE_TOKEN}".encode()
+    if not VECTOR_SERVICE_TOKEN or not hmac.compare_digest(
+        authorization.encode(), expected
+    ):
+        raise HTTPException(status_code=401, detail="Invalid vector service token")
+
+
+app = FastAPI(dependencies=[Depends(check_token)])
+store = LocalVectorStore()
+
+
+class DocumentIn(BaseModel):
+    page_content: str
+    metadata: dict[str, Any] = {}
+
+
+class AddRequest(BaseModel):
+    user_id: int
+    documents: list[DocumentIn]
+
+
+class SearchRequest(BaseModel):
+    user_id: int
+    query: str
+    k: int
+
+
+class DeleteRequest(BaseModel):
+    user_id: int
+    file_name: str
+    keep_hash: str | None = None
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+
+@app.post("/add")
+def add(request: AddRequest):
+    from langchain_core.documents import Document
+
+    documents = [Document(**doc.model_dump()) for doc in request.documents]
+    return {"path": store.add_documents(request.user_id, documents)}
+
+
+@app.post("/search")
+def search(request: SearchRequest):
+    documents = store.search(request.user_id, request.query, request.k)
+    return {
+        "documents": [
+            {"page_content": doc.page_content, "metadata": doc.metadata}
+            for doc in documents
+        ]
+    }
+
+
+@app.post("/delete")
+def delete(request: DeleteRequest):
+    return {
+        "deleted": store.delete_file(
+            request.user_id, request.file_name, request.keep_hash
+        )
+    }
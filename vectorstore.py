@@ -0,0 +1,203 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from loguru import logger
+
+from config import (
+    EMBEDDINGS_DIR,
+    INDEX_CACHE_SIZE,
+    RERANK_FETCH_K,
+    RERANK_MODEL,
+    VECTOR_SERVICE_TOKEN,
+    VECTOR_SERVICE_URL,
+)
+
+
+class LocalVectorStore:
+    """Per-user FAISS indexes under `embeddings_dir`, cached in memory.
+
+    A cached index is reloaded when its file changed on disk, so several processes
+    sharing the directory still see each other's writes. Only the `cache_size` most
+    recently used indexes are kept."""
+
+    def __init__(
+        self, embeddings_dir: str = EMBEDDINGS_DIR, cache_size: int = INDEX_CACHE_SIZE
+    ):
+        self.embeddings_dir = embeddings_dir
+        self.cache_size = cache_size
+        self.indexes = OrderedDict()
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def index_path(self, user_id: int) -> str:
+        return os.path.join(self.embeddings_dir, str(user_id), "vectorstore.faiss")
+
+    def _user_lock(self, user_id: int) -> threading.Lock:
+        with self.lock:
+            return self.locks.setdefault(user_id, threading.Lock())
+
+    def _modified(self, path: str):
+        try:
+            stat = os.stat(os.path.join(path, "index.faiss"))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _cache(self, user_id: int, vectorstore, modified):
+        with self.lock:
+            self.indexes[user_id] = (vectorstore, modified)
+            self.indexes.move_to_end(user_id)
+            while len(self.indexes) > self.cache_size:
+                evicted, _ = self.indexes.popitem(last=False)
+                logger.info("Evicted the index of user {} from memory", evicted)
+
+    def _load(self, user_id: int):
+        """The user's index or None, must be called holding the user's lock."""
+        from langchain_community.vectorstores import FAISS
+
+        from embedder import get_embeddings
+
+        path = self.index_path(user_id)
+        modified = self._modified(path)
+        with self.lock:
+            if modified is None:
+                self.indexes.pop(user_id, None)
+                return None
+            cached = self.indexes.get(user_id)
+            if cached and cached[1] == modified:
+                self.indexes.move_to_end(user_id)
+                return cached[0]
+
+        vectorstore = FAISS.load_local(
+            path, get_embeddings(), allow_dangerous_deserialization=True
+        )
+        self._cache(user_id, vectorstore, modified)
+        return vectorstore
+
+    def _save(self, user_id: int, vectorstore):
+        path = self.index_path(user_id)
+        vectorstore.save_local(path)
+        self._cache(user_id, vectorstore, self._modified(path))
+
+    def add_documents(self, user_id: int, documents) -> str:
+        from langchain_community.vectorstores import FAISS
+
+        from embedder import get_embeddings
+
+        with self._user_lock(user_id):
+            vectorstore = self._load(user_id)
+            if vectorstore:
+                vectorstore.add_documents(documents)
+            else:
+                vectorstore = FAISS.from_documents(documents, get_embeddings())
+            self._save(user_id, vectorstore)
+        return self.index_path(user_id)
+
+    def search(self, user_id: int, query: str, k: int):
+        """The `k` best chunks, reranked from the top RERANK_FETCH_K when enabled."""
+        from reranker import rerank
+
+        fetch_k = max(k, RERANK_FETCH_K) if RERANK_MODEL else k
+        with self._user_lock(user_id):
+            vectorstore = self._load(user_id)
+            if not vectorstore:
+                return []
+            docs = vectorstore.similarity_search(query, k=fetch_k)
+        return rerank(query, docs, k)
+
+    def delete_file(
+        self, user_id: int, file_name: str, keep_hash: str | None = None
+    ) -> int:
+        """Remove the chunks of a file without re-embedding the remaining ones.
+
+        Chunks of the content `keep_hash` are kept, so a replaced file's old chunks
+        can be dropped after its new ones were added."""
+        with self._user_lock(user_id):
+            vectorstore = self._load(user_id)
+            if not vectorstore:
+                return 0
+            ids = [
+                doc_id
+                for doc_id, doc in vectorstore.docstore._dict.items()
+                if doc.metadata.get("file_name") == file_name
+                and (keep_hash is None or doc.metadata.get("content_hash") != keep_hash)
+            ]
+            if ids:
+                vectorstore.delete(ids)
+                self._save(user_id, vectorstore)
+        logger.info("Deleted {} chunks of {}", len(ids), file_name)
+        return len(ids)
+
+    def warm_up(self):
+        from embedder import get_embeddings
+        from reranker import get_cross_encoder
+
+        get_embeddings().embed_query("warm up")
+        if RERANK_MODEL:
+            get_cross_encoder()
+
+
+class RemoteVectorStore:
+    """Client of `vector_service`, same interface as `LocalVectorStore`.
+
+    `url` is either `unix:///path/to/socket` or `http://host:port`."""
+
+    def __init__(
+        self,
+        url: str = VECTOR_SERVICE_URL,
+        token: str = VECTOR_SERVICE_TOKEN,
+        timeout: float = 60,
+    ):
+        import httpx
+
+        headers = {"Authorization": f"Bearer {token}"}
+        if url.startswith("unix://"):
+            transport = httpx.HTTPTransport(uds=url[len("unix://") :])
+            self.client = httpx.Client(
+                transport=transport,
+                base_url="http://vectors",
+                headers=headers,
+                timeout=timeout,
+            )
+        else:
+            self.client = httpx.Client(base_url=url, headers=headers, timeout=timeout)
+
+    def _post(self, path: str, payload: dict):
+        response = self.client.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def add_documents(self, user_id: int, documents) -> str:
+        payload = {
+            "user_id": user_id,
+            "documents": [
+                {"page_content": doc.page_content, "metadata": doc.metadata}
+                for doc in documents
+            ],
+        }
+        return self._post("/add", payload)["path"]
+
+    def search(self, user_id: int, query: str, k: int):
+        from langchain_core.documents import Document
+
+        payload = {"user_id": user_id, "query": query, "k": k}
+        return [Document(**doc) for doc in self._post("/search", payload)["documents"]]
+
+    def delete_file(
+        self, user_id: int, file_name: str, keep_hash: str | None = None
+    ) -> int:
+        payload = {"user_id": user_id, "file_name": file_name, "keep_hash": keep_hash}
+        return self._post("/delete", payload)["deleted"]
+
+    def warm_up(self):
+        self.client.get("/health").raise_for_status()
+
+
+@lru_cache(maxsize=None)
+def get_vector_store():
+    """The shared search service when VECTOR_SERVICE_URL is set, else in process."""
+    if VECTOR_SERVICE_URL:
+        return RemoteVectorStore()
+    return LocalVectorStore()